@@ -0,0 +1,232 @@
+"""Before/after benchmark for the compact storage layout (see compact_schema.py).
+
+Reports database size, page-cache footprint (bytes of the b-trees the
+workload reads, from the dbstat virtual table when SQLite provides it) and join
+latency for a workload of existing BrickView queries. The compact database is
+also timed with the same joins written against its integer keys directly.
+
+Usage:
+    python bench_schema.py
+    python bench_schema.py --before real_estate_database1.sqlite --after compact.sqlite
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from compact_schema import build_compact_database
+
+
+# Existing query text from brikview.py, unchanged
+WORKLOAD = {
+    "listings x attributes (insight 3)": """
+        SELECT p.furnishing_status, COUNT(*), AVG(l.price), AVG(l.price / l.sqft)
+        FROM listings l
+        JOIN property_attributes p ON l.listing_id = p.listing_id
+        WHERE l.sqft > 0
+        GROUP BY p.furnishing_status
+    """,
+    "sales x listings (insight 11)": """
+        SELECT l.City, AVG(s.Days_on_Market)
+        FROM sales s
+        INNER JOIN listings l ON s.Listing_ID = l.Listing_ID
+        GROUP BY l.City
+    """,
+    "agents x listings x sales (insight 19)": """
+        SELECT a.Agent_ID, a.Name, COUNT(s.Listing_ID) AS total_sales_closed
+        FROM agents a
+        JOIN listings l ON a.Agent_ID = l.Agent_ID
+        JOIN sales s ON l.Listing_ID = s.Listing_ID
+        GROUP BY a.Agent_ID, a.Name
+    """,
+    "active listings per agent (insight 25)": """
+        SELECT a.Agent_ID, a.Name, COUNT(l.Listing_ID)
+        FROM agents a
+        JOIN listings l ON a.Agent_ID = l.Agent_ID
+        LEFT JOIN sales s ON l.Listing_ID = s.Listing_ID
+        WHERE s.Listing_ID IS NULL
+        GROUP BY a.Agent_ID, a.Name
+    """,
+    "buyer type share (insight 26)": """
+        SELECT buyer_type, COUNT(*) * 100.0 / (SELECT COUNT(*) FROM buyers)
+        FROM buyers
+        GROUP BY buyer_type
+    """,
+    "buyers x sales x listings (insight 27)": """
+        SELECT l.City, COUNT(CASE WHEN b.loan_taken = 1 THEN 1 END) * 100.0 / COUNT(*)
+        FROM buyers b
+        JOIN sales s ON b.sale_id = s.Listing_ID
+        JOIN listings l ON s.Listing_ID = l.Listing_ID
+        GROUP BY l.City
+    """,
+    "payment mode usage (insight 29)": """
+        SELECT payment_mode, COUNT(*) AS usage_count
+        FROM buyers
+        GROUP BY payment_mode
+        ORDER BY usage_count DESC
+    """,
+    "buyers x sales (insight 30)": """
+        SELECT b.loan_taken, AVG(s.Days_on_Market)
+        FROM buyers b
+        JOIN sales s ON b.sale_id = s.Listing_ID
+        GROUP BY b.loan_taken
+    """,
+    "filtered listings (Data Visualization)": """
+        SELECT l.Listing_ID, l.City, l.Property_Type, l.Price, l.Date_Listed,
+               a.Name, s.Date_Sold, s.Days_on_Market, l.Latitude, l.Longitude
+        FROM listings l
+        JOIN agents a ON l.Agent_ID = a.Agent_ID
+        LEFT JOIN sales s ON l.Listing_ID = s.Listing_ID
+        WHERE l.Price BETWEEN 0 AND 1e12
+    """,
+}
+
+# The same joins on integer keys and dimension codes, compact database only
+NATIVE_WORKLOAD = {
+    "listings x attributes (insight 3)": """
+        SELECT f.value, COUNT(*), AVG(l.Price), AVG(l.Price / l.Sqft)
+        FROM listings_data l
+        JOIN property_attributes_data p ON l.listing_key = p.listing_key
+        JOIN dim_furnishing_status f ON f.id = p.furnishing_status_id
+        WHERE l.Sqft > 0
+        GROUP BY p.furnishing_status_id
+    """,
+    "sales x listings (insight 11)": """
+        SELECT c.value, AVG(s.Days_on_Market)
+        FROM sales_data s
+        JOIN listings_data l ON s.listing_key = l.listing_key
+        JOIN dim_city c ON c.id = l.city_id
+        GROUP BY l.city_id
+    """,
+    "agents x listings x sales (insight 19)": """
+        SELECT a.agent_code, a.Name, COUNT(*)
+        FROM sales_data s
+        JOIN listings_data l ON s.listing_key = l.listing_key
+        JOIN agents_data a ON a.agent_key = l.agent_key
+        GROUP BY a.agent_key
+    """,
+    "active listings per agent (insight 25)": """
+        SELECT a.agent_code, a.Name, COUNT(*)
+        FROM listings_data l
+        JOIN agents_data a ON a.agent_key = l.agent_key
+        WHERE NOT EXISTS (SELECT 1 FROM sales_data s WHERE s.listing_key = l.listing_key)
+        GROUP BY a.agent_key
+    """,
+    "buyer type share (insight 26)": """
+        SELECT t.value, COUNT(*) * 100.0 / (SELECT COUNT(*) FROM buyers_data)
+        FROM buyers_data b
+        LEFT JOIN dim_buyer_type t ON t.id = b.buyer_type_id
+        GROUP BY b.buyer_type_id
+    """,
+    "buyers x sales x listings (insight 27)": """
+        SELECT c.value, SUM(b.loan_taken = 1) * 100.0 / COUNT(*)
+        FROM buyers_data b
+        JOIN sales_data s ON b.sale_listing_key = s.listing_key
+        JOIN listings_data l ON s.listing_key = l.listing_key
+        JOIN dim_city c ON c.id = l.city_id
+        GROUP BY l.city_id
+    """,
+    "payment mode usage (insight 29)": """
+        SELECT m.value, COUNT(*) AS usage_count
+        FROM buyers_data b
+        LEFT JOIN dim_payment_mode m ON m.id = b.payment_mode_id
+        GROUP BY b.payment_mode_id
+        ORDER BY usage_count DESC
+    """,
+    "buyers x sales (insight 30)": """
+        SELECT b.loan_taken, AVG(s.Days_on_Market)
+        FROM buyers_data b
+        JOIN sales_data s ON b.sale_listing_key = s.listing_key
+        GROUP BY b.loan_taken
+    """,
+    "filtered listings (Data Visualization)": """
+        SELECT l.listing_code, c.value, t.value, l.Price, l.listed_day,
+               a.Name, s.sold_day, s.Days_on_Market, l.Latitude, l.Longitude
+        FROM listings_data l
+        JOIN agents_data a ON a.agent_key = l.agent_key
+        JOIN dim_city c ON c.id = l.city_id
+        JOIN dim_property_type t ON t.id = l.property_type_id
+        LEFT JOIN sales_data s ON s.listing_key = l.listing_key
+        WHERE l.Price BETWEEN 0 AND 1e12
+    """,
+}
+
+
+# Bytes of the b-trees (tables and indexes) the workload opens, i.e. the pages it
+# can pull into the page cache; without dbstat every page of the file is counted
+def page_cache_footprint(conn, queries):
+    roots = set()
+    for sql in queries:
+        for row in conn.execute(f"EXPLAIN {sql}"):
+            if row[1] == "OpenRead" and row[4] == 0:
+                roots.add(row[3])
+
+    names = [
+        name for name, rootpage in conn.execute("SELECT name, rootpage FROM sqlite_master")
+        if rootpage in roots
+    ]
+    try:
+        return sum(
+            conn.execute("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = ?", (name,)).fetchone()[0]
+            for name in names
+        )
+    except sqlite3.OperationalError:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_size * conn.execute("PRAGMA page_count").fetchone()[0]
+
+
+# Median wall time in ms; each run uses a fresh connection with a cold page cache
+def time_query(path, sql, repeat):
+    timings = []
+    for _ in range(repeat):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+        conn.close()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact BrickView schema")
+    parser.add_argument("--before", default="real_estate_database1.sqlite")
+    parser.add_argument("--after", help="compact database (built from --before when omitted)")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        after = args.after
+        if after is None:
+            after = os.path.join(tmp, "compact.sqlite")
+            build_compact_database(args.before, after)
+
+        before_conn = sqlite3.connect(f"file:{args.before}?mode=ro", uri=True)
+        after_conn = sqlite3.connect(f"file:{after}?mode=ro", uri=True)
+
+        print(f"{'':42}{'before':>14}{'after':>14}")
+        print(f"{'database size (bytes)':42}{os.path.getsize(args.before):>14,}{os.path.getsize(after):>14,}")
+        print(
+            f"{'workload page-cache footprint (bytes)':42}"
+            f"{page_cache_footprint(before_conn, WORKLOAD.values()):>14,}"
+            f"{page_cache_footprint(after_conn, WORKLOAD.values()):>14,}"
+        )
+        print(
+            f"{'  same, native integer-key queries':42}{'':>14}"
+            f"{page_cache_footprint(after_conn, NATIVE_WORKLOAD.values()):>14,}"
+        )
+        before_conn.close()
+        after_conn.close()
+
+        print()
+        print(f"{'join latency, median ms':42}{'before':>14}{'after views':>14}{'after native':>14}")
+        for name, sql in WORKLOAD.items():
+            before_ms = time_query(args.before, sql, args.repeat)
+            after_ms = time_query(after, sql, args.repeat)
+            native_ms = time_query(after, NATIVE_WORKLOAD[name], args.repeat)
+            print(f"{name:42}{before_ms:>14.2f}{after_ms:>14.2f}{native_ms:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
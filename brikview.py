@@ -1,13 +1,108 @@
 import streamlit as st
 import sqlite3
+import logging
+import os
+import threading
+import time
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-
+from scipy.spatial import cKDTree
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from db_versions import connect_database, current_database
+from frame_budget import compact_frame, get_frame, memory_report, process_rss_bytes
+from price_model import PRICE_MODEL_MIN_R2, PRICE_MODEL_QUERY, load_price_model, price_model_design
+
+
+# Resolve the database snapshot once per script run so every query in the run
+# reads the same version, even if a new one is published meanwhile
+DATA_VERSION, DB_PATH = current_database()
+
+LOGGER = logging.getLogger("brikview")
+
+# Set BRICKVIEW_MEMORY_DEBUG=1 on the server to list every session in the memory panel
+MEMORY_DEBUG = os.environ.get("BRICKVIEW_MEMORY_DEBUG") == "1"
+
+# Guards for user-written SQL on the "SQL insights" page
+ADHOC_ROW_LIMIT = 1000
+ADHOC_TIME_BUDGET_S = 5.0
+ADHOC_STEP_BUDGET = 50_000_000
+ADHOC_PROGRESS_INTERVAL = 10_000
+ADHOC_MAX_VALUE_BYTES = 64 * 1024
+ADHOC_MAX_COLUMNS = 100
+ADHOC_MAX_RESULT_BYTES = 8 * 1024**2
+
+# Only plain reads are allowed: no writes, ATTACH, PRAGMA or temp objects
+ADHOC_ALLOWED_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+}
+ADHOC_BLOCKED_FUNCTIONS = {"load_extension", "randomblob", "zeroblob"}
+
+# Features used to find comparable listings ("comps")
+COMPS_DEFAULT_K = 10
+COMPS_FEATURE_QUERY = """
+    SELECT
+        l.Listing_ID,
+        l.City,
+        l.Property_Type,
+        l.Price,
+        l.Sqft,
+        l.Latitude,
+        l.Longitude,
+        p.bedrooms,
+        p.bathrooms,
+        p.year_built,
+        p.metro_distance_km,
+        p.furnishing_status,
+        p.parking_available,
+        p.power_backup
+    FROM listings l
+    JOIN property_attributes p
+        ON l.Listing_ID = p.listing_id
+"""
+COMPS_NUMERIC_FEATURES = [
+    "Price", "Sqft", "Latitude", "Longitude", "bedrooms", "bathrooms",
+    "year_built", "metro_distance_km", "parking_available", "power_backup"
+]
+COMPS_LOG_FEATURES = ["Price", "Sqft"]
+COMPS_CATEGORICAL_FEATURES = ["Property_Type", "furnishing_status"]
+
+# Buyer/loan cube: finest-grain cells, rolled up in memory by the buyer insights
+BUYER_CUBE_QUERY = """
+    SELECT
+        l.City AS city,
+        b.buyer_type,
+        b.payment_mode,
+        b.loan_taken,
+        b.loan_provider,
+        strftime('%Y-%m', s.Date_Sold) AS sale_month,
+        COUNT(*) AS buyers,
+        SUM(b.loan_taken = 1) AS loans,
+        SUM(b.loan_amount) AS loan_amount_sum,
+        COUNT(b.loan_amount) AS loan_amount_count,
+        SUM(s.Days_on_Market) AS days_on_market_sum,
+        COUNT(s.Days_on_Market) AS days_on_market_count
+    FROM buyers b
+    LEFT JOIN sales s
+        ON b.sale_id = s.Listing_ID
+    LEFT JOIN listings l
+        ON s.Listing_ID = l.Listing_ID
+    GROUP BY 1, 2, 3, 4, 5, 6
+"""
+BUYER_CUBE_DIMENSIONS = ["city", "buyer_type", "payment_mode", "loan_taken", "loan_provider", "sale_month"]
+BUYER_CUBE_MEASURES = [
+    "buyers", "loans", "loan_amount_sum", "loan_amount_count",
+    "days_on_market_sum", "days_on_market_count"
+]
+BUYER_CUBE_MISSING = "Unknown"
 
 
 # Function to connect to SQLite database
 def get_data(query, params=None):
-    conn = sqlite3.connect("real_estate_database1.sqlite")
+    conn = connect_database(DB_PATH)
     if params:
         df = pd.read_sql_query(query, conn, params=params)
     else:
@@ -16,6 +111,288 @@ def get_data(query, params=None):
     return df
 
 
+# Predefined insight results are the same for every session, so they are cached
+# once per data version instead of being kept per session
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_insight_data(sql, data_version):
+    return compact_frame(get_data(sql))
+
+
+# Per-user (filtered) result frame kept for this session between reruns, within the frame_budget byte budgets
+def session_frame(key, loader):
+    ctx = get_script_run_ctx()
+    return get_frame(ctx.session_id if ctx else "local", key, loader)
+
+
+# Download button whose CSV is only built after "Prepare CSV" is clicked. The CSV is
+# kept with the session's frames, so it counts against the same byte budget.
+# key identifies the data shown; when it changes the CSV has to be prepared again.
+def csv_download_button(df, file_name, key):
+    ready_key = f"csv_ready_{file_name}"
+    if st.session_state.get(ready_key) != key:
+        if not st.button("📦 Prepare CSV", key=f"csv_prepare_{file_name}"):
+            return
+        st.session_state[ready_key] = key
+    data = session_frame(("csv", key), lambda: df.to_csv(index=False).encode())
+    st.download_button("⬇️ Download CSV", data, file_name, "text/csv")
+
+
+# Authorizer for ad-hoc queries: deny anything that is not a plain read
+def adhoc_authorizer(action, arg1, arg2, db_name, trigger):
+    if action not in ADHOC_ALLOWED_ACTIONS:
+        return sqlite3.SQLITE_DENY
+    if action == sqlite3.SQLITE_FUNCTION and arg2.lower() in ADHOC_BLOCKED_FUNCTIONS:
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+# Run user SQL on a read-only connection with time, VM-step and row guards.
+# Returns (DataFrame, truncated). Results are cached per SQL text and data version,
+# so the cache holds at most max_entries * ADHOC_MAX_RESULT_BYTES.
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def run_adhoc_query(sql, data_version):
+    conn = connect_database(DB_PATH)
+    conn.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, ADHOC_MAX_VALUE_BYTES)
+    conn.setlimit(sqlite3.SQLITE_LIMIT_COLUMN, ADHOC_MAX_COLUMNS)
+    conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+    conn.set_authorizer(adhoc_authorizer)
+
+    deadline = time.monotonic() + ADHOC_TIME_BUDGET_S
+    budget = {"steps": 0, "reason": None}
+
+    def progress():
+        budget["steps"] += ADHOC_PROGRESS_INTERVAL
+        if budget["steps"] > ADHOC_STEP_BUDGET:
+            budget["reason"] = f"exceeded the {ADHOC_STEP_BUDGET:,} VM-step budget"
+        elif time.monotonic() > deadline:
+            budget["reason"] = f"exceeded the {ADHOC_TIME_BUDGET_S:g} s time budget"
+        return 1 if budget["reason"] else 0
+
+    conn.set_progress_handler(progress, ADHOC_PROGRESS_INTERVAL)
+
+    try:
+        cursor = conn.execute(sql)
+        if cursor.description is None:
+            raise sqlite3.OperationalError("Only SELECT statements are allowed")
+        columns = [col[0] for col in cursor.description]
+
+        # Stream rows one at a time and stop one past the limit to detect truncation.
+        # Text and blob sizes are added up so wide values cannot multiply into gigabytes.
+        rows = []
+        result_bytes = 0
+        for row in cursor:
+            result_bytes += sum(len(v) if isinstance(v, (str, bytes)) else 8 for v in row)
+            if result_bytes > ADHOC_MAX_RESULT_BYTES:
+                raise sqlite3.OperationalError(
+                    f"Query aborted: result too large (over {ADHOC_MAX_RESULT_BYTES // 1024**2} MB)"
+                )
+            rows.append(row)
+            if len(rows) > ADHOC_ROW_LIMIT:
+                break
+    except sqlite3.OperationalError as exc:
+        if budget["reason"]:
+            raise sqlite3.OperationalError(f"Query aborted: {budget['reason']}") from exc
+        raise
+    finally:
+        conn.close()
+
+    truncated = len(rows) > ADHOC_ROW_LIMIT
+    df = pd.DataFrame.from_records(rows[:ADHOC_ROW_LIMIT], columns=columns)
+    return df, truncated
+
+
+# Normalized feature matrix plus one KD-tree per city, rebuilt when the data version changes
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_comps_index(data_version):
+    listings = get_data(COMPS_FEATURE_QUERY)
+
+    numeric = listings[COMPS_NUMERIC_FEATURES].astype(float)
+    numeric[COMPS_LOG_FEATURES] = np.log1p(numeric[COMPS_LOG_FEATURES])
+    numeric = numeric.fillna(numeric.median())
+    numeric = (numeric - numeric.mean()) / numeric.std(ddof=0).replace(0, 1)
+
+    categorical = pd.get_dummies(listings[COMPS_CATEGORICAL_FEATURES]).astype(float)
+    features = np.hstack([numeric.to_numpy(), categorical.to_numpy()])
+
+    trees = {}
+    for city, rows in listings.groupby("City").indices.items():
+        trees[city] = (cKDTree(features[rows]), rows)
+
+    return {
+        "listings": listings,
+        "features": features,
+        "trees": trees,
+        "row_of": pd.Series(np.arange(len(listings)), index=listings["Listing_ID"])
+    }
+
+
+# Fitted coefficients for the current data, loaded from disk or fitted and saved
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_price_model(data_version):
+    return load_price_model(data_version, DB_PATH)
+
+
+# Estimated price for every active (unsold) listing, scored in one vectorized pass
+@st.cache_data(max_entries=2, show_spinner=False)
+def get_price_estimates(data_version):
+    model = get_price_model(data_version)
+    frame = get_data(PRICE_MODEL_QUERY)
+    frame = frame[frame["is_active"] == 1].reset_index(drop=True)
+
+    estimates = np.exp(price_model_design(frame, model) @ model["coef"]) * model["smearing"]
+
+    return pd.DataFrame({
+        "Listing_ID": frame["Listing_ID"],
+        "City": frame["City"],
+        "Property_Type": frame["Property_Type"],
+        "Price": frame["Price"],
+        "Estimated_Price": estimates.round(2),
+        "Price_Gap_Pct": ((frame["Price"] - estimates) / estimates * 100).round(2)
+    })
+
+
+# Dense buyer/loan cube: one NumPy array per measure, one axis per dimension
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_buyer_cube(data_version):
+    cells = get_data(BUYER_CUBE_QUERY)
+
+    levels, codes = {}, []
+    for dim in BUYER_CUBE_DIMENSIONS:
+        values = pd.Categorical(cells[dim].fillna(BUYER_CUBE_MISSING))
+        levels[dim] = list(values.categories)
+        codes.append(values.codes)
+
+    shape = tuple(len(levels[dim]) for dim in BUYER_CUBE_DIMENSIONS)
+    measures = {}
+    for measure in BUYER_CUBE_MEASURES:
+        values = np.zeros(shape)
+        np.add.at(values, tuple(codes), cells[measure].fillna(0).to_numpy(dtype=float))
+        measures[measure] = values
+
+    return {"levels": levels, "measures": measures}
+
+
+# Slice the cube on filters ({dimension: [levels]}) and roll up to the "by" dimensions.
+# Returns NumPy columns with one entry per non-empty cell and all measures summed.
+def roll_up_buyer_cube(cube, by, filters=None):
+    filters = filters or {}
+    measures = dict(cube["measures"])
+
+    for axis, dim in enumerate(BUYER_CUBE_DIMENSIONS):
+        if dim in filters:
+            positions = [i for i, v in enumerate(cube["levels"][dim]) if v in filters[dim]]
+            measures = {m: np.take(values, positions, axis=axis) for m, values in measures.items()}
+
+    rolled_axes = tuple(axis for axis, dim in enumerate(BUYER_CUBE_DIMENSIONS) if dim not in by)
+    measures = {m: values.sum(axis=rolled_axes) for m, values in measures.items()}
+
+    by = [dim for dim in BUYER_CUBE_DIMENSIONS if dim in by]
+    kept_levels = [
+        [v for v in cube["levels"][dim] if dim not in filters or v in filters[dim]]
+        for dim in by
+    ]
+    non_empty = measures["buyers"].ravel() > 0
+    grids = np.meshgrid(*[np.arange(len(dim_levels)) for dim_levels in kept_levels], indexing="ij")
+    columns = {
+        dim: np.asarray(dim_levels)[grid.ravel()[non_empty]]
+        for dim, dim_levels, grid in zip(by, kept_levels, grids)
+    }
+    for m, values in measures.items():
+        columns[m] = values.ravel()[non_empty]
+    return columns
+
+
+def query_buyer_cube(cube, by, filters=None):
+    return pd.DataFrame(roll_up_buyer_cube(cube, by, filters))
+
+
+# Insight 26: share of buyers by buyer type
+def buyer_type_share(cube):
+    cells = roll_up_buyer_cube(cube, ["buyer_type"])
+    return pd.DataFrame({
+        "buyer_type": cells["buyer_type"],
+        "percentage": cells["buyers"] * 100.0 / cells["buyers"].sum()
+    })
+
+
+# Insight 27: loan uptake rate by city (buyers with a matched listing only)
+def loan_uptake_by_city(cube):
+    cities = [c for c in cube["levels"]["city"] if c != BUYER_CUBE_MISSING]
+    cells = roll_up_buyer_cube(cube, ["city"], {"city": cities})
+    rate = cells["loans"] * 100.0 / cells["buyers"]
+    order = np.argsort(-rate, kind="stable")
+    return pd.DataFrame({"City": cells["city"][order], "loan_uptake_rate": rate[order]})
+
+
+# Insight 28: average loan amount by buyer type, loan-backed purchases only
+def avg_loan_by_buyer_type(cube):
+    cells = roll_up_buyer_cube(cube, ["buyer_type"], {"loan_taken": [1]})
+    return pd.DataFrame({
+        "buyer_type": cells["buyer_type"],
+        "avg_loan_amount": cells["loan_amount_sum"] / cells["loan_amount_count"]
+    })
+
+
+# Insight 29: payment mode usage
+def payment_mode_usage(cube):
+    cells = roll_up_buyer_cube(cube, ["payment_mode"])
+    order = np.argsort(-cells["buyers"], kind="stable")
+    return pd.DataFrame({
+        "payment_mode": cells["payment_mode"][order],
+        "usage_count": cells["buyers"][order].astype(int)
+    })
+
+
+# Insight 30: average days on market with and without a loan
+def days_on_market_by_loan(cube):
+    cells = roll_up_buyer_cube(cube, ["loan_taken"])
+    sold = cells["days_on_market_count"] > 0
+    return pd.DataFrame({
+        "loan_taken": cells["loan_taken"][sold],
+        "avg_days_on_market": cells["days_on_market_sum"][sold] / cells["days_on_market_count"][sold]
+    })
+
+
+# k nearest listings in the same city as listing_id, closest first
+def find_comps(comps_index, listing_id, k=COMPS_DEFAULT_K):
+    row = comps_index["row_of"].get(listing_id)
+    if row is None:
+        return comps_index["listings"].iloc[0:0]
+
+    city = comps_index["listings"].at[row, "City"]
+    tree, rows = comps_index["trees"][city]
+
+    distances, positions = tree.query(comps_index["features"][row], k=min(k + 1, len(rows)))
+    distances, positions = np.atleast_1d(distances), np.atleast_1d(positions)
+    matches = rows[positions]
+    keep = matches != row
+
+    comps = comps_index["listings"].iloc[matches[keep][:k]].copy()
+    comps.insert(1, "Distance", np.round(distances[keep][:k], 3))
+    return comps
+
+
+# Build the per-version caches in a background thread the first time any session
+# sees a data version, so the pages that need them are ready when opened.
+# Streamlit only stores cache results from threads with a script run context, so
+# the thread borrows the current run's; the cached builders have no spinners so
+# nothing is drawn into that session, and pages wrap their calls in st.spinner.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def warm_caches(data_version):
+    def warm():
+        try:
+            get_price_estimates(data_version)
+            get_comps_index(data_version)
+            get_buyer_cube(data_version)
+        except Exception:
+            LOGGER.exception("Warming caches for data version %s failed", data_version)
+
+    thread = threading.Thread(target=warm, name=f"warm-{data_version}", daemon=True)
+    add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return thread
+
+
 
 
 # Streamlit App Title
@@ -23,7 +400,9 @@ st.set_page_config(page_title="BrickView: Real Estate Analytics Platform")
 
 # Sidebar for navigation
 st.sidebar.title("Navigation")
-page = st.sidebar.radio("Go to", ["Project Introduction", "Data Visualization", "SQL insights", "Creator Info"])
+page = st.sidebar.radio("Go to", ["Project Introduction", "Data Visualization", "SQL insights", "Comparables", "Buyer Analytics", "Creator Info"])
+st.sidebar.caption(f"Data version: {DATA_VERSION}")
+warm_caches(DATA_VERSION)
 
 
 # -------------------------------- PAGE 1: Introduction --------------------------------
@@ -115,6 +494,24 @@ elif page == "Data Visualization":
             "Date Range",
             value=[]
         )
+
+        # Listed vs model-estimated price (active listings only), offered only when
+        # the model explains enough of the price variation to mean something
+        with st.spinner("Fitting price model..."):
+            price_model_r2 = float(get_price_model(DATA_VERSION)["r2"])
+        price_gap_enabled = price_model_r2 >= PRICE_MODEL_MIN_R2
+        price_gap_filter = st.selectbox(
+            "Listed vs Estimated Price",
+            ["All", "Underpriced", "Overpriced"],
+            disabled=not price_gap_enabled
+        )
+        price_gap_pct = st.slider("Minimum Price Gap (%)", 0, 100, 10, disabled=not price_gap_enabled)
+        if not price_gap_enabled:
+            price_gap_filter = "All"
+            st.caption(
+                f"Price model R² is {price_model_r2:.3f} (below {PRICE_MODEL_MIN_R2}); "
+                "estimates are close to the mean price, so this filter is off."
+            )
     
     base_query = """
     SELECT
@@ -161,17 +558,32 @@ elif page == "Data Visualization":
             base_query += " AND s.Date_Sold BETWEEN ? AND ?"
         params.extend([start_date, end_date])
 
-    df = get_data(base_query, params)
+    df = session_frame(
+        ("listings", base_query, tuple(params), DATA_VERSION),
+        lambda: get_data(base_query, params)
+    )
+
+    with st.spinner("Scoring listings with the price model..."):
+        estimates = get_price_estimates(DATA_VERSION)
+    df = df.merge(
+        estimates[["Listing_ID", "Estimated_Price", "Price_Gap_Pct"]],
+        on="Listing_ID",
+        how="left"
+    )
+
+    if price_gap_filter == "Underpriced":
+        df = df[df["Price_Gap_Pct"] <= -price_gap_pct]
+    elif price_gap_filter == "Overpriced":
+        df = df[df["Price_Gap_Pct"] >= price_gap_pct]
 
     st.subheader("📋 Filtered Listings")
     st.dataframe(df)
     
-    st.download_button(
-            "⬇️ Download CSV",
-            df.to_csv(index=False),
-            "Filtered_listings.csv",
-            "text/csv"
-        )
+    csv_download_button(
+        df,
+        "Filtered_listings.csv",
+        ("listings", base_query, tuple(params), price_gap_filter, price_gap_pct, DATA_VERSION)
+    )
     
     # ---------------- MAP ---------------- #
 
@@ -195,19 +607,21 @@ elif page == "Data Visualization":
     # ---------------- BAR CHART ---------------- #
 
     st.subheader("📊 Average Price by City")
-    city_price = df.groupby("City")["Price"].mean().reset_index()
+    city_price = df.groupby("City", observed=True)["Price"].mean().reset_index()
     st.bar_chart(city_price.set_index("City"))
 
     # ---------------- PIE CHART ---------------- #
 
     st.subheader("🥧 Property Type Distribution")
     fig1, ax1 = plt.subplots()
-    df["Property_Type"].value_counts().plot.pie(
+    property_counts = df["Property_Type"].value_counts()
+    property_counts[property_counts > 0].plot.pie(
         autopct="%1.1f%%",
         ax=ax1
     )
     ax1.set_ylabel("")
     st.pyplot(fig1)
+    plt.close(fig1)
 
     # ---------------- LINE CHART ---------------- #
 
@@ -231,7 +645,7 @@ elif page == "Data Visualization":
 elif page == "SQL insights":
 
         st.title(" SQL Insights")
-        st.write("Run predefined SQL queries and explore insights from the BrickView database.")
+        st.write("Run predefined or ad-hoc SQL queries and explore insights from the BrickView database.")
 
         queries = {
             "1. What is the average listing price by city?": {
@@ -656,6 +1070,8 @@ elif page == "SQL insights":
                     FROM buyers
                     GROUP BY buyer_type
                 """,
+                "source": "buyer_cube",
+                "view": buyer_type_share,
                 "chart": "pie",
                 "x": "buyer_type",
                 "y": "percentage"
@@ -674,6 +1090,8 @@ elif page == "SQL insights":
                     GROUP BY l.City
                     ORDER BY loan_uptake_rate DESC;
                 """,
+                "source": "buyer_cube",
+                "view": loan_uptake_by_city,
                 "chart": "bar",
                 "x": "City",
                 "y": "loan_uptake_rate"
@@ -687,6 +1105,8 @@ elif page == "SQL insights":
                         WHERE loan_taken = 1
                         GROUP BY buyer_type
                     """,
+                    "source": "buyer_cube",
+                    "view": avg_loan_by_buyer_type,
                     "chart": "bar",
                     "x": "buyer_type",
                     "y": "avg_loan_amount"
@@ -701,6 +1121,8 @@ elif page == "SQL insights":
                         GROUP BY payment_mode
                         ORDER BY usage_count DESC
                     """,
+                    "source": "buyer_cube",
+                    "view": payment_mode_usage,
                     "chart": "bar",
                     "x": "payment_mode",
                     "y": "usage_count"
@@ -716,66 +1138,281 @@ elif page == "SQL insights":
                             ON b.sale_id = s.Listing_ID
                         GROUP BY b.loan_taken
                     """,
+                    "source": "buyer_cube",
+                    "view": days_on_market_by_loan,
                     "chart": "bar",
                     "x": "loan_taken",
                     "y": "avg_days_on_market"
+            },
+
+            "31. How do listed prices compare with model-estimated prices?": {
+                    "source": "price_model",
+                    "chart": "bar",
+                    "x": "City",
+                    "y": "avg_price_gap_pct"
             }
         }
 
-        # ---------------- SELECT QUERY ---------------- #
-
-        selected_query = st.selectbox(
-            "Select a SQL Query",
-            list(queries.keys())
+        query_mode = st.radio(
+            "Mode",
+            ["Predefined insights", "Ad-hoc query"],
+            horizontal=True
         )
 
-        query_info = queries[selected_query]
+        if query_mode == "Predefined insights":
 
-        # ---------------- RUN QUERY ---------------- #
+            # ---------------- SELECT QUERY ---------------- #
 
-        result_df = get_data(query_info["sql"])
+            selected_query = st.selectbox(
+                "Select a SQL Query",
+                list(queries.keys())
+            )
 
-        # ---------------- SHOW SQL (OPTIONAL BUT NICE) ---------------- #
+            query_info = queries[selected_query]
+
+            # ---------------- RUN QUERY ---------------- #
+
+            if query_info.get("source") == "buyer_cube":
+                with st.spinner("Building buyer cube..."):
+                    cube = get_buyer_cube(DATA_VERSION)
+                result_df = query_info["view"](cube)
+            elif query_info.get("source") == "price_model":
+                with st.spinner("Scoring listings with the price model..."):
+                    estimates = get_price_estimates(DATA_VERSION)
+                result_df = estimates.groupby("City").agg(
+                    active_listings=("Listing_ID", "count"),
+                    avg_listed_price=("Price", "mean"),
+                    avg_estimated_price=("Estimated_Price", "mean"),
+                    avg_price_gap_pct=("Price_Gap_Pct", "mean")
+                ).round(2).reset_index()
+            else:
+                result_df = get_insight_data(query_info["sql"], DATA_VERSION)
+
+            # ---------------- SHOW SQL (OPTIONAL BUT NICE) ---------------- #
+
+            if "sql" in query_info:
+                with st.expander("📜 View SQL Query"):
+                    st.code(query_info["sql"], language="sql")
+                if query_info.get("source") == "buyer_cube":
+                    st.caption("Answered from the precomputed buyer/loan cube.")
+            else:
+                price_model_r2 = float(get_price_model(DATA_VERSION)["r2"])
+                st.caption(
+                    "Estimates come from a ridge regression on listing and property "
+                    "attributes, scored for all active (unsold) listings. "
+                    f"In-sample R² on log price: {price_model_r2:.3f}."
+                )
+                if price_model_r2 < PRICE_MODEL_MIN_R2:
+                    st.warning(
+                        "The model explains almost none of the price variation, so estimated "
+                        "prices are close to the mean price and the gaps mostly compare each "
+                        "listing with the mean."
+                    )
 
-        with st.expander("📜 View SQL Query"):
-            st.code(query_info["sql"], language="sql")
+            # ---------------- TABLE OUTPUT (ALWAYS) ---------------- #
 
-        # ---------------- TABLE OUTPUT (ALWAYS) ---------------- #
+            st.subheader("📋 Query Result Table")
+            st.dataframe(result_df, use_container_width=True)
 
-        st.subheader("📋 Query Result Table")
-        st.dataframe(result_df, use_container_width=True)
+            # ---------------- VISUALIZATION ---------------- #
 
-        # ---------------- VISUALIZATION ---------------- #
+            if query_info["chart"] and not result_df.empty:
 
-        if query_info["chart"] and not result_df.empty:
+                st.subheader("📊 Visualization")
 
-            st.subheader("📊 Visualization")
+                if query_info["chart"] == "bar":
+                    st.bar_chart(
+                        result_df.set_index(query_info["x"])[query_info["y"]]
+                    )
 
-            if query_info["chart"] == "bar":
-                st.bar_chart(
-                    result_df.set_index(query_info["x"])[query_info["y"]]
-                )
+                elif query_info["chart"] == "line":
+                    line_df = result_df.assign(**{query_info["x"]: pd.to_datetime(result_df[query_info["x"]])})
+                    st.line_chart(
+                        line_df.set_index(query_info["x"])[query_info["y"]]
+                    )
 
-            elif query_info["chart"] == "line":
-                result_df[query_info["x"]] = pd.to_datetime(result_df[query_info["x"]])
-                st.line_chart(
-                    result_df.set_index(query_info["x"])[query_info["y"]]
-                )
+                elif query_info["chart"] == "pie":
+                    fig, ax = plt.subplots()
+                    ax.pie(
+                        result_df[query_info["y"]],
+                        labels=result_df[query_info["x"]],
+                        autopct="%1.1f%%"
+                    )
+                    st.pyplot(fig)
+                    plt.close(fig)
+            csv_download_button(result_df, "query_results.csv", ("insight", selected_query, DATA_VERSION))
+        else:
 
-            elif query_info["chart"] == "pie":
-                fig, ax = plt.subplots()
-                ax.pie(
-                    result_df[query_info["y"]],
-                    labels=result_df[query_info["x"]],
-                    autopct="%1.1f%%"
-                )
-                st.pyplot(fig)
-        st.download_button(
-            "⬇️ Download CSV",
-            result_df.to_csv(index=False),
-            "query_results.csv",
-            "text/csv"
+            # ---------------- AD-HOC QUERY ---------------- #
+
+            st.caption(
+                f"Read-only. Results are limited to {ADHOC_ROW_LIMIT:,} rows and "
+                f"queries are stopped after {ADHOC_TIME_BUDGET_S:g} s."
+            )
+
+            adhoc_sql = st.text_area(
+                "SQL Query",
+                "SELECT City, COUNT(*) AS listings\nFROM listings\nGROUP BY City",
+                height=200
+            )
+
+            if st.button("▶️ Run Query"):
+                if not adhoc_sql.strip():
+                    st.warning("Enter a SQL query to run.")
+                else:
+                    try:
+                        result_df, truncated = run_adhoc_query(adhoc_sql.strip(), DATA_VERSION)
+                    except (sqlite3.Error, ValueError) as exc:
+                        st.error(f"Query failed: {exc}")
+                    else:
+                        if truncated:
+                            st.warning(f"Showing the first {ADHOC_ROW_LIMIT:,} rows only.")
+
+                        st.subheader("📋 Query Result Table")
+                        st.dataframe(result_df, use_container_width=True)
+
+                        st.download_button(
+                            "⬇️ Download CSV",
+                            result_df.to_csv(index=False),
+                            "adhoc_query_results.csv",
+                            "text/csv"
+                        )
+elif page == "Comparables":
+
+        st.title("🏘️ Comparable Listings")
+        st.write("Find the listings most similar to a selected property in the same city.")
+
+        with st.spinner("Building comparables index..."):
+            comps_index = get_comps_index(DATA_VERSION)
+        all_listings = comps_index["listings"]
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            selected_listing = st.selectbox("Listing ID", all_listings["Listing_ID"])
+
+        with col2:
+            k = st.slider("Number of Comparables", 1, 50, COMPS_DEFAULT_K)
+
+        st.subheader("🏠 Selected Listing")
+        st.dataframe(
+            all_listings[all_listings["Listing_ID"] == selected_listing],
+            use_container_width=True
+        )
+
+        comps_df = find_comps(comps_index, selected_listing, k)
+
+        st.subheader("📋 Comparable Listings")
+        st.dataframe(comps_df, use_container_width=True)
+
+        csv_download_button(
+            comps_df,
+            "comparable_listings.csv",
+            ("comps", selected_listing, k, DATA_VERSION)
         )
+
+        # ---------------- MAP ---------------- #
+
+        st.subheader("🗺️ Selected Listing and Comparables")
+
+        map_df = pd.concat([
+            all_listings[all_listings["Listing_ID"] == selected_listing],
+            comps_df
+        ])[["Latitude", "Longitude"]].dropna()
+        map_df.columns = ["latitude", "longitude"]
+
+        if not map_df.empty:
+            st.map(map_df)
+
+elif page == "Buyer Analytics":
+
+        st.title("🧾 Buyer & Loan Analytics")
+        st.write("Slice buyers by any combination of city, buyer type, payment and loan details.")
+
+        with st.spinner("Building buyer cube..."):
+            cube = get_buyer_cube(DATA_VERSION)
+        levels = cube["levels"]
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            selected_cities = st.multiselect("City", levels["city"])
+            selected_buyer_types = st.multiselect("Buyer Type", levels["buyer_type"])
+            selected_payment_modes = st.multiselect("Payment Mode", levels["payment_mode"])
+
+        with col2:
+            selected_loan = st.selectbox("Loan Taken", ["All", "Yes", "No"])
+            selected_providers = st.multiselect("Loan Provider", levels["loan_provider"])
+            selected_months = st.multiselect("Sale Month", levels["sale_month"])
+
+        filters = {}
+        if selected_cities:
+            filters["city"] = selected_cities
+        if selected_buyer_types:
+            filters["buyer_type"] = selected_buyer_types
+        if selected_payment_modes:
+            filters["payment_mode"] = selected_payment_modes
+        if selected_loan != "All":
+            filters["loan_taken"] = [1 if selected_loan == "Yes" else 0]
+        if selected_providers:
+            filters["loan_provider"] = selected_providers
+        if selected_months:
+            filters["sale_month"] = selected_months
+
+        # ---------------- KPIs ---------------- #
+
+        totals = query_buyer_cube(cube, [], filters)
+
+        kpi = st.columns(4)
+        if totals.empty:
+            st.warning("No buyers match the selected filters.")
+        else:
+            total = totals.iloc[0]
+            kpi[0].metric("Buyers", f"{int(total['buyers']):,}")
+            kpi[1].metric("Loan Uptake", f"{total['loans'] * 100 / total['buyers']:.1f}%")
+            kpi[2].metric(
+                "Avg Loan Amount",
+                f"{total['loan_amount_sum'] / total['loans']:,.0f}" if total["loans"] else "-"
+            )
+            kpi[3].metric(
+                "Avg Days on Market",
+                f"{total['days_on_market_sum'] / total['days_on_market_count']:.1f}"
+                if total["days_on_market_count"] else "-"
+            )
+
+            # ---------------- BREAKDOWN ---------------- #
+
+            group_by = st.selectbox("Break Down By", BUYER_CUBE_DIMENSIONS)
+
+            breakdown = query_buyer_cube(cube, [group_by], filters)
+            breakdown["buyers"] = breakdown["buyers"].astype(int)
+            breakdown["loan_uptake_pct"] = breakdown["loans"] * 100 / breakdown["buyers"]
+            breakdown["avg_loan_amount"] = breakdown["loan_amount_sum"] / breakdown["loans"].where(breakdown["loans"] > 0)
+            breakdown["avg_days_on_market"] = (
+                breakdown["days_on_market_sum"]
+                / breakdown["days_on_market_count"].where(breakdown["days_on_market_count"] > 0)
+            )
+            breakdown = breakdown[[
+                group_by, "buyers", "loan_uptake_pct", "avg_loan_amount", "avg_days_on_market"
+            ]].round(2)
+
+            metric = st.selectbox(
+                "Metric",
+                ["buyers", "loan_uptake_pct", "avg_loan_amount", "avg_days_on_market"]
+            )
+
+            st.subheader("📋 Breakdown")
+            st.dataframe(breakdown, use_container_width=True)
+
+            st.subheader("📊 Visualization")
+            st.bar_chart(breakdown.set_index(group_by)[metric])
+
+            csv_download_button(
+                breakdown,
+                "buyer_breakdown.csv",
+                ("buyers", group_by, tuple((dim, tuple(values)) for dim, values in filters.items()), DATA_VERSION)
+            )
+
 elif page == "Creator Info":
 
         st.title("🧑‍💻 Creator Information")
@@ -818,4 +1455,28 @@ elif page == "Creator Info":
         - 🧑‍💻 [GitHub](https://github.com/AtharvaBorawake) 
         """)
 
-        st.success("Thank you for exploring BrickView!")
\ No newline at end of file
+        st.success("Thank you for exploring BrickView!")
+
+
+# -------------------------------- MEMORY METRICS --------------------------------
+
+with st.sidebar.expander("🧠 Memory"):
+    sessions = pd.DataFrame(
+        memory_report(),
+        columns=["session", "frames", "resident_bytes", "spilled_bytes", "idle_s"]
+    )
+    rss = process_rss_bytes()
+    ctx = get_script_run_ctx()
+    this_session = sessions[sessions["session"] == (ctx.session_id if ctx else "local")]
+
+    st.metric("Server RSS", f"{rss / 1024**2:,.0f} MB" if rss else "n/a")
+    st.metric("This Session", f"{this_session['resident_bytes'].sum() / 1024**2:,.1f} MB")
+    st.metric(
+        "All Sessions",
+        f"{sessions['resident_bytes'].sum() / 1024**2:,.1f} MB",
+        f"{len(sessions)} sessions",
+        delta_color="off"
+    )
+    # Other sessions' ids and activity are only shown to operators
+    if MEMORY_DEBUG:
+        st.dataframe(sessions, use_container_width=True)
@@ -0,0 +1,267 @@
+"""Build a compact copy of the BrickView database.
+
+The compact layout stores integer rowid surrogate keys instead of TEXT
+identifiers, low-cardinality strings as codes into small dimension tables and
+dates as integer day numbers (days since 1970-01-01). Views named after the
+original tables (listings, property_attributes, agents, sales, buyers) decode
+everything back, so existing query text keeps working unchanged.
+
+The views are correct but not free: most of BrickView's queries run slower
+through them than on the original layout (see bench_schema.py), so the app
+keeps the original layout and this script only builds a file for measurement.
+
+Usage:
+    python compact_schema.py real_estate_database1.sqlite compact.sqlite
+"""
+import argparse
+import os
+import sqlite3
+
+
+# (dimension table, source table, source column)
+DIMENSIONS = [
+    ("dim_city", "listings", "City"),
+    ("dim_property_type", "listings", "Property_Type"),
+    ("dim_furnishing_status", "property_attributes", "furnishing_status"),
+    ("dim_buyer_type", "buyers", "buyer_type"),
+    ("dim_payment_mode", "buyers", "payment_mode"),
+    ("dim_loan_provider", "buyers", "loan_provider"),
+]
+
+# Day number <-> 'YYYY-MM-DD' (2440587.5 is the Julian day of 1970-01-01)
+TO_DAY = "CAST(julianday({col}) - 2440587.5 AS INTEGER)"
+FROM_DAY = "date({col} + 2440587.5)"
+
+SCHEMA = f"""
+CREATE TABLE agents_data (
+    agent_key INTEGER PRIMARY KEY,
+    agent_code TEXT NOT NULL UNIQUE,
+    Name TEXT,
+    Phone TEXT,
+    Email TEXT,
+    commission_rate REAL,
+    deals_closed INTEGER,
+    rating REAL,
+    experience_years INTEGER,
+    avg_closing_days INTEGER
+);
+
+CREATE TABLE listings_data (
+    listing_key INTEGER PRIMARY KEY,
+    listing_code TEXT NOT NULL UNIQUE,
+    city_id INTEGER REFERENCES dim_city,
+    property_type_id INTEGER REFERENCES dim_property_type,
+    Price REAL,
+    Sqft REAL,
+    listed_day INTEGER,
+    agent_key INTEGER REFERENCES agents_data,
+    Latitude REAL,
+    Longitude REAL
+);
+
+CREATE TABLE property_attributes_data (
+    attribute_id INTEGER PRIMARY KEY,
+    listing_key INTEGER REFERENCES listings_data,
+    bedrooms INTEGER,
+    bathrooms INTEGER,
+    floor_number INTEGER,
+    total_floors INTEGER,
+    year_built INTEGER,
+    is_rented INTEGER,
+    tenant_count INTEGER,
+    furnishing_status_id INTEGER REFERENCES dim_furnishing_status,
+    metro_distance_km REAL,
+    parking_available INTEGER,
+    power_backup INTEGER
+);
+CREATE INDEX property_attributes_data_listing ON property_attributes_data(listing_key);
+
+CREATE TABLE sales_data (
+    sale_key INTEGER PRIMARY KEY,
+    listing_key INTEGER REFERENCES listings_data,
+    Sale_Price REAL,
+    sold_day INTEGER,
+    Days_on_Market REAL
+);
+CREATE INDEX sales_data_listing ON sales_data(listing_key);
+
+CREATE TABLE buyers_data (
+    buyer_id INTEGER PRIMARY KEY,
+    sale_listing_key INTEGER REFERENCES listings_data,
+    buyer_type_id INTEGER REFERENCES dim_buyer_type,
+    payment_mode_id INTEGER REFERENCES dim_payment_mode,
+    loan_taken INTEGER,
+    loan_provider_id INTEGER REFERENCES dim_loan_provider,
+    loan_amount INTEGER
+);
+
+-- Compatibility views: same names, columns and values as the original tables.
+-- Dimension codes are decoded with correlated scalar subqueries, which SQLite
+-- only evaluates for the columns a query reads; it does not drop unused LEFT
+-- JOINs from aggregate queries. Listing and agent codes still use LEFT JOINs so
+-- joins on them can go through the listing_code/agent_code unique indexes; as
+-- subqueries those joins become full nested scans.
+CREATE VIEW agents AS
+SELECT
+    a.agent_code AS Agent_ID, a.Name, a.Phone, a.Email, a.commission_rate,
+    a.deals_closed, a.rating, a.experience_years, a.avg_closing_days
+FROM agents_data a;
+
+CREATE VIEW listings AS
+SELECT
+    l.listing_code AS Listing_ID,
+    (SELECT value FROM dim_city WHERE id = l.city_id) AS City,
+    (SELECT value FROM dim_property_type WHERE id = l.property_type_id) AS Property_Type,
+    l.Price,
+    l.Sqft,
+    {FROM_DAY.format(col="l.listed_day")} AS Date_Listed,
+    a.agent_code AS Agent_ID,
+    l.Latitude,
+    l.Longitude
+FROM listings_data l
+LEFT JOIN agents_data a ON a.agent_key = l.agent_key;
+
+CREATE VIEW property_attributes AS
+SELECT
+    p.attribute_id,
+    l.listing_code AS listing_id,
+    p.bedrooms, p.bathrooms, p.floor_number, p.total_floors, p.year_built,
+    p.is_rented, p.tenant_count,
+    (SELECT value FROM dim_furnishing_status WHERE id = p.furnishing_status_id) AS furnishing_status,
+    p.metro_distance_km, p.parking_available, p.power_backup
+FROM property_attributes_data p
+LEFT JOIN listings_data l ON l.listing_key = p.listing_key;
+
+CREATE VIEW sales AS
+SELECT
+    l.listing_code AS Listing_ID,
+    s.Sale_Price,
+    {FROM_DAY.format(col="s.sold_day")} AS Date_Sold,
+    s.Days_on_Market
+FROM sales_data s
+LEFT JOIN listings_data l ON l.listing_key = s.listing_key;
+
+CREATE VIEW buyers AS
+SELECT
+    b.buyer_id,
+    l.listing_code AS sale_id,
+    (SELECT value FROM dim_buyer_type WHERE id = b.buyer_type_id) AS buyer_type,
+    (SELECT value FROM dim_payment_mode WHERE id = b.payment_mode_id) AS payment_mode,
+    b.loan_taken,
+    (SELECT value FROM dim_loan_provider WHERE id = b.loan_provider_id) AS loan_provider,
+    b.loan_amount
+FROM buyers_data b
+LEFT JOIN listings_data l ON l.listing_key = b.sale_listing_key;
+"""
+
+LOAD = f"""
+INSERT INTO agents_data (
+    agent_code, Name, Phone, Email, commission_rate,
+    deals_closed, rating, experience_years, avg_closing_days
+)
+SELECT
+    Agent_ID, Name, Phone, Email, commission_rate,
+    deals_closed, rating, experience_years, avg_closing_days
+FROM src.agents
+ORDER BY Agent_ID;
+
+INSERT INTO listings_data (
+    listing_code, city_id, property_type_id, Price, Sqft,
+    listed_day, agent_key, Latitude, Longitude
+)
+SELECT
+    l.Listing_ID, c.id, t.id, l.Price, l.Sqft,
+    {TO_DAY.format(col="l.Date_Listed")}, a.agent_key, l.Latitude, l.Longitude
+FROM src.listings l
+LEFT JOIN dim_city c ON c.value = l.City
+LEFT JOIN dim_property_type t ON t.value = l.Property_Type
+LEFT JOIN agents_data a ON a.agent_code = l.Agent_ID
+ORDER BY l.Listing_ID;
+
+INSERT INTO property_attributes_data
+SELECT
+    p.attribute_id, l.listing_key, p.bedrooms, p.bathrooms, p.floor_number,
+    p.total_floors, p.year_built, p.is_rented, p.tenant_count, f.id,
+    p.metro_distance_km, p.parking_available, p.power_backup
+FROM src.property_attributes p
+LEFT JOIN listings_data l ON l.listing_code = p.listing_id
+LEFT JOIN dim_furnishing_status f ON f.value = p.furnishing_status;
+
+INSERT INTO sales_data (listing_key, Sale_Price, sold_day, Days_on_Market)
+SELECT l.listing_key, s.Sale_Price, {TO_DAY.format(col="s.Date_Sold")}, s.Days_on_Market
+FROM src.sales s
+LEFT JOIN listings_data l ON l.listing_code = s.Listing_ID;
+
+INSERT INTO buyers_data
+SELECT
+    b.buyer_id, l.listing_key, bt.id, pm.id, b.loan_taken, lp.id, b.loan_amount
+FROM src.buyers b
+LEFT JOIN listings_data l ON l.listing_code = b.sale_id
+LEFT JOIN dim_buyer_type bt ON bt.value = b.buyer_type
+LEFT JOIN dim_payment_mode pm ON pm.value = b.payment_mode
+LEFT JOIN dim_loan_provider lp ON lp.value = b.loan_provider;
+"""
+
+# Every original row must come back unchanged through the compatibility views
+CHECKED_TABLES = ["listings", "property_attributes", "agents", "sales", "buyers"]
+
+
+def _check_round_trip(conn):
+    for table in CHECKED_TABLES:
+        counts = [conn.execute(f"SELECT COUNT(*) FROM {db}.{table}").fetchone()[0] for db in ("src", "main")]
+        if counts[0] != counts[1]:
+            raise ValueError(f"{table}: {counts[0]} source rows but {counts[1]} compact rows")
+
+        columns = ", ".join(f'"{row[1]}"' for row in conn.execute(f"PRAGMA src.table_info({table})"))
+        for left, right in (("src", "main"), ("main", "src")):
+            diff = conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT {columns} FROM {left}.{table} "
+                f"EXCEPT SELECT {columns} FROM {right}.{table})"
+            ).fetchone()[0]
+            if diff:
+                raise ValueError(f"{table}: {diff} rows differ between source and compact views")
+
+
+# Write the compact layout of source_path to target_path (overwritten)
+def build_compact_database(source_path, target_path):
+    if os.path.exists(target_path):
+        os.remove(target_path)
+
+    conn = sqlite3.connect(target_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (source_path,))
+        with conn:
+            for dim_table, _, _ in DIMENSIONS:
+                conn.execute(f"CREATE TABLE {dim_table} (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+            conn.executescript(SCHEMA)
+
+            for dim_table, table, column in DIMENSIONS:
+                conn.execute(
+                    f"INSERT INTO {dim_table} (value) "
+                    f"SELECT DISTINCT {column} FROM src.{table} WHERE {column} IS NOT NULL ORDER BY 1"
+                )
+            conn.executescript(LOAD)
+
+        _check_round_trip(conn)
+        conn.execute("DETACH DATABASE src")
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    except Exception:
+        conn.close()
+        os.remove(target_path)
+        raise
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a compact BrickView database")
+    parser.add_argument("source", help="database in the original TEXT-keyed layout")
+    parser.add_argument("target", help="path for the compact database")
+    args = parser.parse_args()
+
+    build_compact_database(args.source, args.target)
+    print(f"Built {args.target}")
+
+
+if __name__ == "__main__":
+    main()
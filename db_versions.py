@@ -0,0 +1,146 @@
+"""Versioned database snapshots for BrickView.
+
+Each published build is copied into db_versions/ under a new version id and
+switched in by atomically replacing the CURRENT pointer file. Published files
+are never modified afterwards, so readers that already opened a version keep
+reading it while new connections pick up the new one.
+
+Usage:
+    python db_versions.py publish path/to/new_build.sqlite
+    python db_versions.py current
+"""
+import argparse
+import os
+import sqlite3
+import time
+from urllib.request import pathname2url
+
+
+DEFAULT_DB_PATH = "real_estate_database1.sqlite"
+VERSIONS_DIR = "db_versions"
+POINTER_FILE = os.path.join(VERSIONS_DIR, "CURRENT")
+KEEP_VERSIONS = 3
+REQUIRED_TABLES = {"listings", "property_attributes", "agents", "sales", "buyers"}
+
+
+# (version, path) of the database new connections should use.
+# Falls back to the bundled database until a version has been published.
+def current_database():
+    try:
+        with open(POINTER_FILE) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        stat = os.stat(DEFAULT_DB_PATH)
+        return f"{stat.st_mtime_ns}-{stat.st_size}", DEFAULT_DB_PATH
+    return os.path.splitext(name)[0], os.path.join(VERSIONS_DIR, name)
+
+
+# Read-only connection; published snapshots are opened as immutable so
+# SQLite skips file locking entirely
+def connect_database(path):
+    uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(VERSIONS_DIR):
+        uri += "&immutable=1"
+    return sqlite3.connect(uri, uri=True)
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _validate(conn):
+    if conn.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+        raise ValueError("Database failed PRAGMA quick_check")
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    missing = REQUIRED_TABLES - names
+    if missing:
+        raise ValueError(f"Database is missing tables: {', '.join(sorted(missing))}")
+
+
+# Copy source_path into a new version, validate it and atomically make it current
+def publish_database(source_path):
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    # Version ids sort chronologically, which prune_versions relies on; they use UTC
+    # so a local clock going back at the end of daylight saving time cannot reorder them
+    now = time.time_ns()
+    version = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(now // 10**9))}-{now % 10**9:09d}"
+    final_path = os.path.join(VERSIONS_DIR, f"{version}.sqlite")
+    tmp_path = os.path.join(VERSIONS_DIR, f".{version}.sqlite.tmp")
+
+    src = sqlite3.connect(f"file:{pathname2url(os.path.abspath(source_path))}?mode=ro", uri=True)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        src.backup(dst)
+        dst.execute("PRAGMA journal_mode=DELETE")
+        _validate(dst)
+    except Exception:
+        dst.close()
+        os.remove(tmp_path)
+        raise
+    finally:
+        src.close()
+    dst.close()
+
+    _fsync_path(tmp_path)
+    os.replace(tmp_path, final_path)
+
+    # Swap the pointer: readers see either the old or the new name, never a partial one
+    pointer_tmp = f"{POINTER_FILE}.{os.getpid()}.tmp"
+    with open(pointer_tmp, "w") as f:
+        f.write(f"{version}.sqlite\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, POINTER_FILE)
+    _fsync_path(VERSIONS_DIR)
+
+    prune_versions()
+    return version
+
+
+# Published snapshot file names, oldest first
+def _snapshots():
+    if not os.path.isdir(VERSIONS_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(VERSIONS_DIR)
+        if name.endswith(".sqlite") and not name.startswith(".")
+    )
+
+
+# (version, path) of every published snapshot still on disk, oldest first
+def published_versions():
+    return [(os.path.splitext(name)[0], os.path.join(VERSIONS_DIR, name)) for name in _snapshots()]
+
+
+# Remove all but the newest KEEP_VERSIONS snapshots (never the current one)
+def prune_versions(keep=KEEP_VERSIONS):
+    _, current_path = current_database()
+    snapshots = _snapshots()
+    for name in snapshots[:-keep]:
+        path = os.path.join(VERSIONS_DIR, name)
+        if os.path.abspath(path) != os.path.abspath(current_path):
+            os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage BrickView database versions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="publish a new database build")
+    publish.add_argument("source", help="path to the SQLite database to publish")
+    commands.add_parser("current", help="show the current database version")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        version = publish_database(args.source)
+        print(f"Published version {version}")
+    else:
+        version, path = current_database()
+        print(f"{version}\t{path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Byte budgets for result frames kept between Streamlit reruns.
+
+Frames are stored per session and accounted with DataFrame.memory_usage(deep=True).
+When a session goes over SESSION_BUDGET_BYTES, or all sessions together go over
+GLOBAL_BUDGET_BYTES, the least recently used frames are spilled to disk and read
+back on their next use. Frames are downcast (low-cardinality strings to
+categoricals, coordinates to float32, integers to the smallest type) before
+they are stored. Prepared download payloads (bytes) can be stored the same way,
+so they count against the same budgets.
+
+Spill files are capped at SPILL_BUDGET_BYTES in total; beyond that the earliest
+spilled frames are dropped and reloaded when next needed. Spill files belong to
+the process that wrote them, so any found at import are left over from an
+earlier run and are deleted.
+
+Stored frames are shared with callers: treat them as read-only.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+
+SESSION_BUDGET_BYTES = 64 * 1024**2
+GLOBAL_BUDGET_BYTES = 256 * 1024**2
+SESSION_MAX_FRAMES = 32
+SESSION_IDLE_TIMEOUT_S = 30 * 60
+SPILL_DIR = os.path.join(".brickview_cache", "spill")
+SPILL_BUDGET_BYTES = 1024**3
+
+CATEGORY_MAX_RATIO = 0.5
+FLOAT32_COLUMNS = {"latitude", "longitude"}
+
+# session_id -> {"frames": OrderedDict(key -> entry), "last_used": monotonic time}
+# entry: {"frame": DataFrame, bytes or None when spilled, "nbytes": int, "spill_path": str or None}
+#        plus "spill_bytes" (file size) and "spilled_at" (monotonic time) once spilled
+_sessions = {}
+_lock = threading.RLock()
+
+
+def frame_nbytes(df):
+    if isinstance(df, bytes):
+        return len(df)
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# Smaller copy of df: categoricals, float32 coordinates, downcast integers
+def compact_frame(df):
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object:
+            if len(series) and series.nunique() <= CATEGORY_MAX_RATIO * len(series):
+                df[col] = series.astype("category")
+        elif str(col).lower() in FLOAT32_COLUMNS and pd.api.types.is_float_dtype(series):
+            df[col] = series.astype("float32")
+        elif pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="integer")
+    return df
+
+
+def _resident_bytes(session):
+    return sum(entry["nbytes"] for entry in session["frames"].values() if entry["frame"] is not None)
+
+
+def _spill(entry):
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    path = os.path.join(SPILL_DIR, f"{uuid.uuid4().hex}.pkl")
+    pd.to_pickle(entry["frame"], path)
+    entry["frame"], entry["spill_path"] = None, path
+    entry["spill_bytes"], entry["spilled_at"] = os.path.getsize(path), time.monotonic()
+
+
+def _discard(entry):
+    if entry["spill_path"] and os.path.exists(entry["spill_path"]):
+        os.remove(entry["spill_path"])
+
+
+# Delete spill files left behind by an earlier process
+def _clear_spill_dir():
+    if not os.path.isdir(SPILL_DIR):
+        return
+    for name in os.listdir(SPILL_DIR):
+        if name.endswith(".pkl"):
+            try:
+                os.remove(os.path.join(SPILL_DIR, name))
+            except OSError:
+                pass
+
+
+def _oldest_resident(session, protected):
+    for key, entry in session["frames"].items():
+        if entry["frame"] is not None and key != protected:
+            return entry
+    return None
+
+
+def _enforce_budgets(session_id, protected):
+    session = _sessions[session_id]
+
+    while len(session["frames"]) > SESSION_MAX_FRAMES:
+        key = next(iter(session["frames"]))
+        _discard(session["frames"].pop(key))
+
+    while _resident_bytes(session) > SESSION_BUDGET_BYTES:
+        victim = _oldest_resident(session, protected)
+        if victim is None:
+            break
+        _spill(victim)
+
+    # Over the global budget: spill from whichever session holds the most
+    while sum(_resident_bytes(s) for s in _sessions.values()) > GLOBAL_BUDGET_BYTES:
+        candidates = sorted(_sessions.items(), key=lambda item: _resident_bytes(item[1]), reverse=True)
+        for sid, session in candidates:
+            victim = _oldest_resident(session, protected if sid == session_id else None)
+            if victim is not None:
+                _spill(victim)
+                break
+        else:
+            break
+
+    _enforce_spill_budget()
+
+
+# Over the spill budget: drop spilled frames in the order they went to disk
+def _enforce_spill_budget():
+    spilled = [
+        (entry["spilled_at"], sid, key)
+        for sid, session in _sessions.items()
+        for key, entry in session["frames"].items()
+        if entry["frame"] is None
+    ]
+    spilled.sort(key=lambda item: item[0])
+    total = sum(_sessions[sid]["frames"][key]["spill_bytes"] for _, sid, key in spilled)
+    for _, sid, key in spilled:
+        if total <= SPILL_BUDGET_BYTES:
+            break
+        entry = _sessions[sid]["frames"].pop(key)
+        total -= entry["spill_bytes"]
+        _discard(entry)
+
+
+def _prune_idle(now):
+    for sid in [sid for sid, s in _sessions.items() if now - s["last_used"] > SESSION_IDLE_TIMEOUT_S]:
+        drop_session(sid)
+
+
+# Frame (or bytes) stored under key for this session, calling loader() on a miss.
+# Values larger than the session budget are returned without being stored.
+def get_frame(session_id, key, loader):
+    now = time.monotonic()
+    with _lock:
+        _prune_idle(now)
+        session = _sessions.setdefault(session_id, {"frames": OrderedDict(), "last_used": now})
+        session["last_used"] = now
+        entry = session["frames"].get(key)
+        if entry is not None:
+            session["frames"].move_to_end(key)
+            if entry["frame"] is not None:
+                return entry["frame"]
+            spill_path = entry["spill_path"]
+        else:
+            spill_path = None
+
+    # Load outside the lock so one slow query never blocks other sessions.
+    # The spill file may have been dropped meanwhile; then reload from scratch.
+    frame = None
+    if spill_path:
+        try:
+            frame = pd.read_pickle(spill_path)
+        except FileNotFoundError:
+            pass
+    if frame is None:
+        frame = loader()
+        if isinstance(frame, pd.DataFrame):
+            frame = compact_frame(frame)
+    nbytes = frame_nbytes(frame)
+
+    with _lock:
+        session = _sessions.setdefault(session_id, {"frames": OrderedDict(), "last_used": now})
+        old = session["frames"].pop(key, None)
+        if old is not None:
+            _discard(old)
+        if nbytes > SESSION_BUDGET_BYTES:
+            return frame
+
+        session["frames"][key] = {"frame": frame, "nbytes": nbytes, "spill_path": None}
+        _enforce_budgets(session_id, key)
+    return frame
+
+
+def drop_session(session_id):
+    with _lock:
+        session = _sessions.pop(session_id, None)
+        if session is not None:
+            for entry in session["frames"].values():
+                _discard(entry)
+
+
+# One row per session: frame count, resident and spilled bytes, idle seconds
+def memory_report():
+    now = time.monotonic()
+    with _lock:
+        return [
+            {
+                "session": sid,
+                "frames": len(s["frames"]),
+                "resident_bytes": _resident_bytes(s),
+                "spilled_bytes": sum(e["nbytes"] for e in s["frames"].values() if e["frame"] is None),
+                "idle_s": round(now - s["last_used"], 1),
+            }
+            for sid, s in _sessions.items()
+        ]
+
+
+# Current resident set size of this process, or None where /proc is unavailable
+def process_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_clear_spill_dir()
@@ -0,0 +1,132 @@
+"""Load test for the session frame budgets in frame_budget.py.
+
+Simulates many concurrent analyst sessions, each repeatedly fetching listing
+frames with random filters the way the Data Visualization page does, and
+prints process RSS and cached-frame totals as sessions pile up. Run once with
+the default budgets and once with --baseline, which behaves like the app did
+before frame_budget: every request runs its query and nothing is kept between
+reruns. Retention trades memory for fewer queries; the summary shows both.
+
+Usage:
+    python load_test_memory.py --sessions 100 --requests 20
+    python load_test_memory.py --sessions 100 --requests 20 --baseline
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import frame_budget
+from db_versions import connect_database, current_database
+
+
+LISTINGS_QUERY = """
+    SELECT
+        l.Listing_ID, l.City, l.Property_Type, l.Price, l.Date_Listed,
+        a.Name AS Agent_Name, s.Date_Sold, s.Days_on_Market,
+        l.Latitude AS latitude, l.Longitude AS longitude
+    FROM listings l
+    JOIN agents a ON l.Agent_ID = a.Agent_ID
+    LEFT JOIN sales s ON l.Listing_ID = s.Listing_ID
+    WHERE l.Price BETWEEN ? AND ?
+"""
+
+
+queries_run = 0
+queries_lock = threading.Lock()
+
+
+def fetch_listings(path, low, high):
+    global queries_run
+    with queries_lock:
+        queries_run += 1
+    conn = connect_database(path)
+    try:
+        return pd.read_sql_query(LISTINGS_QUERY, conn, params=(low, high))
+    finally:
+        conn.close()
+
+
+def run_session(session_id, path, requests, seed, baseline):
+    rng = random.Random(seed)
+    for _ in range(requests):
+        # Mostly wide price ranges, like analysts running with few filters
+        low = rng.choice([0, 0, 0, 100_000, 500_000])
+        high = rng.choice([5_000_000, 5_000_000, 4_000_000, 3_000_000 + rng.randrange(1000)])
+        if baseline:
+            # Before frame_budget the frame only lived for one script run
+            fetch_listings(path, low, high)
+            continue
+        frame_budget.get_frame(
+            session_id,
+            ("listings", low, high),
+            lambda: fetch_listings(path, low, high)
+        )
+
+
+def print_status(label):
+    report = frame_budget.memory_report()
+    resident = sum(row["resident_bytes"] for row in report)
+    spilled = sum(row["spilled_bytes"] for row in report)
+    rss = frame_budget.process_rss_bytes()
+    rss_text = f"{rss / 1024**2:10.1f}" if rss else f"{'n/a':>10}"
+    print(f"{label:>10}{len(report):>10}{resident / 1024**2:>14.1f}{spilled / 1024**2:>14.1f}{rss_text}")
+    return resident, rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for BrickView session frame budgets")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20, help="frames fetched per session")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--session-budget-mb", type=float, default=8)
+    parser.add_argument("--global-budget-mb", type=float, default=64)
+    parser.add_argument("--baseline", action="store_true", help="keep no frames between requests")
+    args = parser.parse_args()
+
+    frame_budget.SESSION_BUDGET_BYTES = int(args.session_budget_mb * 1024**2)
+    frame_budget.GLOBAL_BUDGET_BYTES = int(args.global_budget_mb * 1024**2)
+
+    _, path = current_database()
+    print(f"{'sessions':>10}{'tracked':>10}{'resident MB':>14}{'spilled MB':>14}{'RSS MB':>10}")
+    print_status("start")
+
+    peak_resident = peak_rss = 0
+    done = 0
+    lock = threading.Lock()
+    step = max(1, args.sessions // 10)
+    start = time.perf_counter()
+
+    def session_task(n):
+        nonlocal done, peak_resident, peak_rss
+        run_session(f"load-{n}", path, args.requests, seed=n, baseline=args.baseline)
+        with lock:
+            done += 1
+            if done % step == 0:
+                resident, rss = print_status(done)
+                peak_resident = max(peak_resident, resident)
+                peak_rss = max(peak_rss, rss or 0)
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(session_task, range(args.sessions)))
+
+    elapsed = time.perf_counter() - start
+
+    print()
+    print(f"queries run:          {queries_run:,} of {args.sessions * args.requests:,} requests")
+    print(f"wall time:            {elapsed:.1f} s")
+    print(f"peak resident frames: {peak_resident / 1024**2:.1f} MB")
+    print(f"peak RSS:             {peak_rss / 1024**2:.1f} MB")
+    if not args.baseline:
+        within = peak_resident <= frame_budget.GLOBAL_BUDGET_BYTES
+        print(f"global budget:        {args.global_budget_mb:.1f} MB ({'respected' if within else 'EXCEEDED'})")
+
+    for row in frame_budget.memory_report():
+        frame_budget.drop_session(row["session"])
+
+
+if __name__ == "__main__":
+    main()
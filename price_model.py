@@ -0,0 +1,184 @@
+"""Listing price model for BrickView.
+
+Ridge regression on log(Price), with coefficients saved under MODEL_DIR per
+data version and model spec. Kept free of Streamlit so it can also be fitted
+outside the app: run the warm step after publishing a database version so the
+app only has to load the model, and saved models of pruned versions are removed.
+
+Usage:
+    python db_versions.py publish path/to/new_build.sqlite
+    python price_model.py warm
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from db_versions import connect_database, current_database, published_versions
+
+
+MODEL_DIR = ".brickview_cache"
+PRICE_MODEL_ALPHA = 1.0
+PRICE_MODEL_QUERY = """
+    SELECT
+        l.Listing_ID,
+        l.City,
+        l.Property_Type,
+        l.Price,
+        l.Sqft,
+        p.bedrooms,
+        p.bathrooms,
+        p.year_built,
+        p.is_rented,
+        p.furnishing_status,
+        p.metro_distance_km,
+        p.parking_available,
+        p.power_backup,
+        s.Listing_ID IS NULL AS is_active
+    FROM listings l
+    JOIN property_attributes p
+        ON l.Listing_ID = p.listing_id
+    LEFT JOIN sales s
+        ON l.Listing_ID = s.Listing_ID
+    WHERE l.Price > 0 AND l.Sqft > 0
+"""
+PRICE_MODEL_NUMERIC_FEATURES = [
+    "Sqft", "bedrooms", "bathrooms", "year_built", "is_rented",
+    "metro_distance_km", "parking_available", "power_backup"
+]
+PRICE_MODEL_LOG_FEATURES = ["Sqft"]
+PRICE_MODEL_CATEGORICAL_FEATURES = ["City", "Property_Type", "furnishing_status"]
+# Bump when price_model_design or fit_price_model change how the model is built
+PRICE_MODEL_FORMAT = 3
+# Below this in-sample R^2 on log price the estimates are little better than
+# the mean price, so the app does not offer them as a listing filter
+PRICE_MODEL_MIN_R2 = 0.3
+
+
+def read_price_model_frame(db_path):
+    conn = connect_database(db_path)
+    try:
+        return pd.read_sql_query(PRICE_MODEL_QUERY, conn)
+    finally:
+        conn.close()
+
+
+# Design matrix for the price model: standardized numerics, one-hot categoricals, intercept
+def price_model_design(frame, model):
+    numeric = frame[PRICE_MODEL_NUMERIC_FEATURES].to_numpy(dtype=float)
+    log_cols = [PRICE_MODEL_NUMERIC_FEATURES.index(col) for col in PRICE_MODEL_LOG_FEATURES]
+    numeric[:, log_cols] = np.log1p(numeric[:, log_cols])
+    numeric = (numeric - model["numeric_mean"]) / model["numeric_std"]
+    numeric = np.where(np.isnan(numeric), 0.0, numeric)
+
+    blocks = [np.ones((len(frame), 1)), numeric]
+    for col in PRICE_MODEL_CATEGORICAL_FEATURES:
+        levels = model[f"levels_{col}"]
+        codes = pd.Categorical(frame[col], categories=levels).codes
+        # Unseen levels (code -1) map to an all-zero row
+        one_hot = np.vstack([np.eye(len(levels)), np.zeros(len(levels))])[codes]
+        blocks.append(one_hot)
+
+    return np.hstack(blocks)
+
+
+# Fit ridge regression on log(Price); the intercept is not penalized.
+# exp() of a log-scale prediction is a geometric mean, so Duan's smearing factor
+# mean(exp(residual)) is stored to turn it back into an expected price.
+# The in-sample R^2 on log price is stored as a fit diagnostic.
+def fit_price_model(frame):
+    numeric = frame[PRICE_MODEL_NUMERIC_FEATURES].astype(float)
+    numeric[PRICE_MODEL_LOG_FEATURES] = np.log1p(numeric[PRICE_MODEL_LOG_FEATURES])
+
+    model = {
+        "numeric_mean": numeric.mean().to_numpy(),
+        "numeric_std": numeric.std(ddof=0).replace(0, 1).to_numpy()
+    }
+    for col in PRICE_MODEL_CATEGORICAL_FEATURES:
+        model[f"levels_{col}"] = np.array(sorted(frame[col].dropna().unique()), dtype=str)
+
+    X = price_model_design(frame, model)
+    y = np.log(frame["Price"].to_numpy(dtype=float))
+
+    penalty = PRICE_MODEL_ALPHA * np.eye(X.shape[1])
+    penalty[0, 0] = 0.0
+    model["coef"] = np.linalg.solve(X.T @ X + penalty, X.T @ y)
+    residual = y - X @ model["coef"]
+    model["smearing"] = np.array(np.mean(np.exp(residual)))
+    model["r2"] = np.array(1.0 - np.sum(residual ** 2) / np.sum((y - y.mean()) ** 2))
+    return model
+
+
+# Short hash of everything that determines the model layout; saved models with a
+# different spec are ignored, so changing a feature list never loads stale coefficients
+def price_model_spec():
+    spec = json.dumps({
+        "format": PRICE_MODEL_FORMAT,
+        "alpha": PRICE_MODEL_ALPHA,
+        "query": PRICE_MODEL_QUERY,
+        "numeric": PRICE_MODEL_NUMERIC_FEATURES,
+        "log": PRICE_MODEL_LOG_FEATURES,
+        "categorical": PRICE_MODEL_CATEGORICAL_FEATURES
+    }, sort_keys=True)
+    return hashlib.sha1(spec.encode()).hexdigest()[:12]
+
+
+# Fitted model for data_version (the database at db_path), loaded from disk or fitted and saved
+def load_price_model(data_version, db_path):
+    spec = price_model_spec()
+    path = os.path.join(MODEL_DIR, f"price_model_{data_version}_{spec}.npz")
+    if os.path.exists(path):
+        with np.load(path) as saved:
+            if "spec" in saved and str(saved["spec"]) == spec:
+                return dict(saved)
+
+    model = fit_price_model(read_price_model_frame(db_path))
+    model["spec"] = np.array(spec)
+
+    # Write to a temp file first so a concurrent reader never sees a partial file
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **model)
+    os.replace(tmp_path, path)
+    return model
+
+
+# Remove saved models for data versions not in keep
+def prune_price_models(keep):
+    if not os.path.isdir(MODEL_DIR):
+        return
+    for name in os.listdir(MODEL_DIR):
+        if not (name.startswith("price_model_") and name.endswith(".npz")):
+            continue
+        version = name[len("price_model_"):].split("_", 1)[0]
+        if version not in keep:
+            try:
+                os.remove(os.path.join(MODEL_DIR, name))
+            except FileNotFoundError:
+                pass
+
+
+# Fit and save the model for the current database version (unless already saved),
+# then drop saved models of versions that are no longer published
+def warm_price_model():
+    version, path = current_database()
+    model = load_price_model(version, path)
+    prune_price_models({version} | {v for v, _ in published_versions()})
+    return version, model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the BrickView price model")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("warm", help="fit and save the model for the current database version")
+    parser.parse_args()
+
+    version, _ = warm_price_model()
+    print(f"Price model ready for version {version}")
+
+
+if __name__ == "__main__":
+    main()